@@ -0,0 +1,110 @@
+"""
+بنچمارک سرعت چانک کردن روی کتاب‌های درسی مصنوعی چند مگابایتی
+
+    python -m benchmarks.chunker_throughput --sizes 1 8 32
+
+برای هر اندازه، سه روش مقایسه می‌شوند:
+    - in_memory: خواندن کل فایل + chunk_by_semantic_sections
+    - stream:    iter_lesson_chunks روی فایل معمولی
+    - mmap:      iter_lesson_chunks با mmap
+"""
+
+import argparse
+import os
+import re
+import tempfile
+import time
+import tracemalloc
+
+from setup_weaviate import chunk_by_semantic_sections, iter_lesson_chunks
+
+
+def build_synthetic_textbook(path: str, size_mb: float, lessons_dir: str = "./lessons") -> int:
+    """
+    ساخت فایل مصنوعی با تکرار دروس موجود تا رسیدن به اندازه‌ی مورد نظر
+
+    هر تکرار عنوان درس جداگانه‌ای دارد (درس 1، درس 2، ...) تا مثل یک کتاب واقعی
+    از چند درس مجزا تشکیل شود.
+    """
+    templates = []
+    for lesson_file in sorted(os.listdir(lessons_dir)):
+        if lesson_file.endswith(".txt"):
+            with open(os.path.join(lessons_dir, lesson_file), "r", encoding="utf-8") as f:
+                templates.append(f.read().strip())
+
+    target_bytes = int(size_mb * 1024 * 1024)
+    written = 0
+    lesson_number = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < target_bytes:
+            lesson_number += 1
+            template = templates[lesson_number % len(templates)]
+            block = re.sub(r"درس\s+\S+", f"درس {lesson_number}", template, count=1) + "\n\n"
+            f.write(block)
+            written += len(block.encode("utf-8"))
+    return written
+
+
+def run_in_memory(path: str) -> int:
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    return len(chunk_by_semantic_sections(content, lesson_name="synthetic"))
+
+
+def run_stream(path: str) -> int:
+    return sum(1 for _ in iter_lesson_chunks(path))
+
+
+def run_mmap(path: str) -> int:
+    return sum(1 for _ in iter_lesson_chunks(path, use_mmap=True))
+
+
+METHODS = {
+    "in_memory": run_in_memory,
+    "stream": run_stream,
+    "mmap": run_mmap,
+}
+
+
+def measure(func, path: str, repeats: int) -> dict:
+    best = float("inf")
+    chunk_count = 0
+    for _ in range(repeats):
+        started = time.perf_counter()
+        chunk_count = func(path)
+        best = min(best, time.perf_counter() - started)
+
+    # حافظه جداگانه اندازه‌گیری می‌شود چون tracemalloc سرعت را پایین می‌آورد
+    tracemalloc.start()
+    func(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"seconds": best, "chunks": chunk_count, "peak_mb": peak / 1024 / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="بنچمارک سرعت چانک کردن")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 8, 32], help="اندازه به مگابایت")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("✂️ Chunker Throughput Benchmark")
+    print("=" * 60)
+    print(f"\n{'size MB':>8} {'method':>10} {'MB/s':>8} {'chunks/s':>10} {'chunks':>8} {'peak MB':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_mb in args.sizes:
+            path = os.path.join(tmp, f"textbook_{size_mb}mb.txt")
+            real_mb = build_synthetic_textbook(path, size_mb) / 1024 / 1024
+
+            for name, func in METHODS.items():
+                stats = measure(func, path, args.repeats)
+                print(f"{size_mb:>8} {name:>10} {real_mb / stats['seconds']:>8.1f} "
+                      f"{stats['chunks'] / stats['seconds']:>10.0f} {stats['chunks']:>8} "
+                      f"{stats['peak_mb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+بک‌اندهای جعلی LLM و Weaviate برای تست بار
+
+این ماژول به عنوان factory برای uvicorn استفاده می‌شود:
+    uvicorn benchmarks.fake_backends:create_app --factory --workers 4
+
+تأخیر هر بک‌اند با متغیرهای محیطی قابل تنظیم است:
+    FAKE_LLM_LATENCY_MS      (پیش‌فرض 200)
+    FAKE_VECTOR_LATENCY_MS   (پیش‌فرض 30)
+"""
+
+import os
+import random
+import time
+from types import SimpleNamespace
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from setup_weaviate import chunk_by_semantic_sections
+
+
+# ==================== LLM جعلی ====================
+
+class FakeChatModel(BaseChatModel):
+    """مدل زبانی جعلی با تأخیر ثابت + نویز؛ هیچ tool call تولید نمی‌کند"""
+
+    latency_ms: float = 200.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency_ms * random.uniform(0.8, 1.2) / 1000)
+        last = messages[-1].content if messages else ""
+        message = AIMessage(content=f"پاسخ آزمایشی به: {last[:40]}")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+# ==================== Weaviate جعلی ====================
+
+def _load_fake_objects(lessons_dir: str = "./lessons") -> list:
+    objects = []
+    for lesson_file in sorted(os.listdir(lessons_dir)):
+        if not lesson_file.endswith(".txt"):
+            continue
+        lesson_name = os.path.splitext(lesson_file)[0]
+        with open(os.path.join(lessons_dir, lesson_file), "r", encoding="utf-8") as f:
+            chunks = chunk_by_semantic_sections(f.read(), lesson_name=lesson_name)
+        for chunk in chunks:
+            objects.append(SimpleNamespace(
+                properties={
+                    "content": chunk["content"],
+                    "section_type": chunk["section_type"],
+                    "importance": chunk["importance"],
+                    "source": lesson_name,
+                    "lesson_id": chunk["lesson_id"],
+                    "chunk_id": chunk["id"],
+                    "related_chunks": chunk["related_chunks"],
+                },
+                metadata=SimpleNamespace(distance=round(random.uniform(0.1, 0.5), 3)),
+            ))
+    return objects
+
+
+class FakeQuery:
+    """شبیه‌سازی collection.query؛ فیلترها نادیده گرفته می‌شوند"""
+
+    def __init__(self, objects: list, latency_ms: float):
+        self._objects = objects
+        self._latency_ms = latency_ms
+
+    def _respond(self, limit: int):
+        time.sleep(self._latency_ms * random.uniform(0.8, 1.2) / 1000)
+        return SimpleNamespace(objects=random.sample(self._objects, min(limit, len(self._objects))))
+
+    def fetch_objects(self, filters=None, limit: int = 3, **kwargs):
+        return self._respond(limit)
+
+    def near_text(self, query: str, filters=None, limit: int = 3, **kwargs):
+        return self._respond(limit)
+
+
+class FakeWeaviateClient:
+    def __init__(self, objects: list, latency_ms: float):
+        query = FakeQuery(objects, latency_ms)
+        collection = SimpleNamespace(query=query)
+        self.collections = SimpleNamespace(get=lambda name: collection)
+
+    def close(self):
+        pass
+
+
+# ==================== App Factory ====================
+
+def create_app():
+    """ساخت اپ API با LLM و Weaviate جعلی (برای هر worker جداگانه)"""
+    os.environ.setdefault("METIS_API_KEY", "fake")
+    os.environ.setdefault("METIS_BASE_URL", "http://localhost:9/v1")
+
+    import main_agent
+    import api_server
+
+    llm_latency = float(os.getenv("FAKE_LLM_LATENCY_MS", "200"))
+    vector_latency = float(os.getenv("FAKE_VECTOR_LATENCY_MS", "30"))
+    objects = _load_fake_objects()
+
+    main_agent.llm_with_tools = FakeChatModel(latency_ms=llm_latency)
+    main_agent.connect_weaviate = lambda deadline=None: FakeWeaviateClient(objects, vector_latency)
+
+    print(f"🧪 [FAKE] pid={os.getpid()} LLM={llm_latency}ms Vector={vector_latency}ms")
+    return api_server.create_app()
@@ -0,0 +1,149 @@
+"""
+تست بار سرور API با بک‌اندهای جعلی
+
+برای هر تعداد worker یک سرور uvicorn بالا می‌آورد، به مدت مشخص درخواست
+هم‌زمان می‌فرستد و RPS پایدار و صدک‌های تأخیر را گزارش می‌کند.
+
+    python -m benchmarks.load_test --workers 1 2 4 --concurrency 32 --duration 20
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from uuid import uuid4
+
+import requests
+
+
+QUERIES = [
+    "درس اول درباره چی بود؟",
+    "شعر درس اول رو برام بخون",
+    "تمرین درست و نادرست درس دوم",
+    "واژه سازی درس اول",
+    "یک املا از درس دوم برام بساز",
+    "ممنون",
+]
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def wait_for_health(base_url: str, timeout: float = 60.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def start_server(workers: int, port: int, db_path: str) -> subprocess.Popen:
+    env = dict(os.environ, CHECKPOINT_DB_URL=db_path)
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "benchmarks.fake_backends:create_app",
+            "--factory", "--workers", str(workers), "--port", str(port),
+            "--log-level", "warning",
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.STDOUT,
+    )
+
+
+def run_load(base_url: str, concurrency: int, duration: float, sessions_per_thread: int) -> dict:
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def worker():
+        # هر thread session های خودش را دارد تا دو نوبت هم‌زمان روی یک session فرستاده نشود
+        session_ids = [str(uuid4()) for _ in range(sessions_per_thread)]
+        http = requests.Session()
+        while time.perf_counter() < stop_at:
+            payload = {"message": random.choice(QUERIES), "session_id": random.choice(session_ids)}
+            started = time.perf_counter()
+            try:
+                ok = http.post(f"{base_url}/v1/chat", json=payload, timeout=60).status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": len(latencies) / wall,
+        "p50": percentile(latencies, 50),
+        "p90": percentile(latencies, 90),
+        "p99": percentile(latencies, 99),
+        "max": latencies[-1] if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="تست بار API با LLM و Weaviate جعلی")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20.0, help="ثانیه برای هر مرحله")
+    parser.add_argument("--sessions-per-thread", type=int, default=2, help="تعداد session های هر thread")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"🔥 Load Test: concurrency={args.concurrency} duration={args.duration}s")
+    print("=" * 60)
+
+    rows = []
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "checkpoints.db")
+            server = start_server(workers, args.port, db_path)
+            base_url = f"http://127.0.0.1:{args.port}"
+            try:
+                if not wait_for_health(base_url):
+                    print(f"❌ سرور با {workers} worker بالا نیامد")
+                    continue
+                print(f"\n⚙️ workers={workers} ...")
+                stats = run_load(base_url, args.concurrency, args.duration, args.sessions_per_thread)
+                rows.append((workers, stats))
+                print(f"   └─ {stats['rps']:.1f} RPS | p50={stats['p50']:.0f}ms "
+                      f"p99={stats['p99']:.0f}ms | errors={stats['errors']}")
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+    print(f"\n{'workers':>8} {'RPS':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+    for workers, s in rows:
+        print(f"{workers:>8} {s['rps']:>8.1f} {s['p50']:>8.0f} {s['p90']:>8.0f} "
+              f"{s['p99']:>8.0f} {s['max']:>8.0f} {s['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+بنچمارک پیش‌تنظیم‌های ایندکس برداری Weaviate روی داده‌ی مصنوعی
+
+    python setup_weaviate.py --benchmark-index --bench-size 20000
+    python -m benchmarks.vector_index --presets default hnsw_pq hnsw_bq
+
+برای هر پیش‌تنظیم یک Collection موقت ساخته می‌شود و این موارد گزارش می‌شوند:
+    - recall@k در مقایسه با جستجوی brute force (numpy)
+    - تأخیر کوئری (p50 / p95)
+    - تخمین حافظه‌ی بردارها و (با --restart-cmd) افزایش حافظه‌ی مقیم Weaviate
+
+حافظه‌ی مقیم (RSS) کل پروسه‌ی Weaviate است و runtime زبان Go حافظه‌ی آزاد شده بعد
+از حذف یک Collection را سریع به سیستم برنمی‌گرداند؛ پس اگر همه‌ی پیش‌تنظیم‌ها پشت
+سر هم در یک پروسه اجرا شوند، عدد پیش‌تنظیم‌های بعدی کمتر (یا حتی منفی) می‌شود.
+برای همین RSS فقط وقتی گزارش می‌شود که Weaviate قبل از هر پیش‌تنظیم دوباره
+راه‌اندازی شود:
+
+    python -m benchmarks.vector_index --restart-cmd "docker-compose restart weaviate"
+
+تنظیمات هر پیش‌تنظیم مستقیم از INDEX_PRESETS خوانده می‌شود و متغیرهای WEAVIATE_*
+(از .env) روی آن اعمال نمی‌شوند تا هر ستون واقعاً همان پیش‌تنظیم باشد.
+"""
+
+import argparse
+import os
+import subprocess
+import time
+from typing import Optional
+
+import numpy as np
+import requests
+import weaviate
+from weaviate.classes.config import Configure, Property, DataType
+
+from setup_weaviate import INDEX_PRESETS, build_vector_index_config
+
+
+EMBEDDING_DIM = 1024  # ابعاد bge-m3
+METRICS_URL = os.getenv("WEAVIATE_METRICS_URL", "http://localhost:2112/metrics")
+READY_URL = os.getenv("WEAVIATE_READY_URL", "http://localhost:8080/v1/.well-known/ready")
+
+
+def make_synthetic_corpus(size: int, query_count: int, dim: int = EMBEDDING_DIM, seed: int = 42):
+    """بردارهای خوشه‌ای نرمال‌شده؛ کوئری‌ها نسخه‌ی نویزدار نقاط داده هستند"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(8, size // 500), dim)).astype(np.float32)
+    labels = rng.integers(0, len(centers), size=size)
+    corpus = centers[labels] + 0.35 * rng.normal(size=(size, dim)).astype(np.float32)
+    corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+
+    picks = rng.integers(0, size, size=query_count)
+    queries = corpus[picks] + 0.05 * rng.normal(size=(query_count, dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return corpus, queries
+
+
+def brute_force_topk(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ corpus.T
+    top = np.argpartition(-scores, k, axis=1)[:, :k]
+    order = np.take_along_axis(-scores, top, axis=1).argsort(axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+def read_resident_memory() -> float:
+    """حافظه‌ی مقیم پروسه‌ی Weaviate به مگابایت (در صورت فعال بودن PROMETHEUS_MONITORING_ENABLED)"""
+    try:
+        text = requests.get(METRICS_URL, timeout=2).text
+    except requests.RequestException:
+        return float("nan")
+    for line in text.splitlines():
+        if line.startswith("process_resident_memory_bytes"):
+            return float(line.split()[-1]) / 1024 / 1024
+    return float("nan")
+
+
+def restart_weaviate(command: str, timeout: float = 120.0):
+    """راه‌اندازی دوباره‌ی Weaviate و صبر تا آماده شدن (برای اندازه‌گیری RSS جداگانه‌ی هر پیش‌تنظیم)"""
+    print(f"🔄 راه‌اندازی دوباره‌ی Weaviate: {command}")
+    subprocess.run(command, shell=True, check=True)
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(READY_URL, timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(1)
+    raise TimeoutError(f"Weaviate بعد از {timeout:.0f} ثانیه آماده نشد")
+
+
+def estimate_vector_memory(settings: dict, size: int, dim: int) -> float:
+    """تخمین حافظه‌ی بردارها (بدون گراف HNSW) به مگابایت"""
+    quantizer = settings.get("quantizer")
+    if quantizer == "pq":
+        per_vector = settings.get("pq_segments") or dim // 4
+    elif quantizer == "bq":
+        per_vector = dim / 8
+    elif quantizer == "sq":
+        per_vector = dim
+    else:
+        per_vector = dim * 4
+    return size * per_vector / 1024 / 1024
+
+
+def benchmark_preset(client, preset: str, corpus, queries, truth, k: int, measure_rss: bool = False) -> dict:
+    # بدون متغیرهای محیطی WEAVIATE_* تا نتیجه واقعاً مربوط به همین پیش‌تنظیم باشد
+    settings = dict(INDEX_PRESETS[preset], preset=preset)
+    # برای داده‌ی کوچک، آموزش quantizer باید زودتر از مقدار پیش‌فرض (100000) شروع شود
+    if settings.get("quantizer") in ("pq", "sq"):
+        settings.setdefault("training_limit", min(len(corpus) // 2, 100000))
+
+    name = f"IndexBench_{preset}"
+    if client.collections.exists(name):
+        client.collections.delete(name)
+
+    memory_before = read_resident_memory() if measure_rss else float("nan")
+    collection = client.collections.create(
+        name=name,
+        vectorizer_config=Configure.Vectorizer.none(),
+        vector_index_config=build_vector_index_config(settings),
+        properties=[Property(name="idx", data_type=DataType.INT)],
+    )
+
+    started = time.perf_counter()
+    with collection.batch.fixed_size(batch_size=500) as batch:
+        for idx, vector in enumerate(corpus):
+            batch.add_object(properties={"idx": idx}, vector=vector.tolist())
+    import_seconds = time.perf_counter() - started
+    if collection.batch.failed_objects:
+        print(f"⚠️ {len(collection.batch.failed_objects)} شیء وارد نشد")
+
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        response = collection.query.near_vector(
+            near_vector=query.tolist(), limit=k, return_properties=["idx"]
+        )
+        latencies.append((time.perf_counter() - started) * 1000)
+        found = {obj.properties["idx"] for obj in response.objects}
+        hits += len(found & set(expected.tolist()))
+
+    memory_after = read_resident_memory() if measure_rss else float("nan")
+    client.collections.delete(name)
+
+    latencies.sort()
+    return {
+        "recall": hits / (len(queries) * k),
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "import_s": import_seconds,
+        "rss_delta_mb": memory_after - memory_before,
+        "vector_mb": estimate_vector_memory(settings, len(corpus), corpus.shape[1]),
+    }
+
+
+def run_index_benchmark(presets=None, corpus_size: int = 20000, query_count: int = 200, k: int = 10,
+                        restart_command: Optional[str] = None):
+    presets = presets or list(INDEX_PRESETS)
+    restart_command = restart_command or os.getenv("WEAVIATE_RESTART_CMD")
+
+    print("=" * 60)
+    print(f"📐 Vector Index Benchmark: n={corpus_size} dim={EMBEDDING_DIM} k={k}")
+    print("=" * 60)
+
+    print("🎲 ساخت داده‌ی مصنوعی و جواب brute force...")
+    corpus, queries = make_synthetic_corpus(corpus_size, query_count)
+    truth = brute_force_topk(corpus, queries, k)
+
+    rows = []
+    for preset in presets:
+        print(f"\n⚙️ {preset} ...")
+        if restart_command:
+            restart_weaviate(restart_command)
+        client = weaviate.connect_to_local(host="localhost", port=8080)
+        try:
+            stats = benchmark_preset(client, preset, corpus, queries, truth, k,
+                                     measure_rss=bool(restart_command))
+        finally:
+            client.close()
+        rows.append((preset, stats))
+        print(f"   └─ recall@{k}={stats['recall']:.3f} p50={stats['p50']:.1f}ms")
+
+    print(f"\n{'preset':>10} {'recall@' + str(k):>10} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'import s':>9} {'RSS Δ MB':>9} {'vec MB':>8}")
+    for preset, s in rows:
+        print(f"{preset:>10} {s['recall']:>10.3f} {s['p50']:>8.1f} {s['p95']:>8.1f} "
+              f"{s['import_s']:>9.1f} {s['rss_delta_mb']:>9.1f} {s['vector_mb']:>8.1f}")
+
+    if not restart_command:
+        print("\nℹ️ RSS گزارش نشد: برای اندازه‌گیری جداگانه‌ی هر پیش‌تنظیم --restart-cmd (یا WEAVIATE_RESTART_CMD) بدهید")
+    elif any(np.isnan(s["rss_delta_mb"]) for _, s in rows):
+        print("\nℹ️ برای اندازه‌گیری RSS، پورت metrics (2112) در docker-compose باید در دسترس باشد")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="بنچمارک پیش‌تنظیم‌های ایندکس برداری")
+    parser.add_argument("--presets", nargs="+", choices=list(INDEX_PRESETS), default=list(INDEX_PRESETS))
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--restart-cmd", help="دستور راه‌اندازی دوباره‌ی Weaviate قبل از هر پیش‌تنظیم (برای RSS)")
+    args = parser.parse_args()
+
+    run_index_benchmark(args.presets, args.size, args.queries, args.k, restart_command=args.restart_cmd)
+
+
+if __name__ == "__main__":
+    main()
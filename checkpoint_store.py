@@ -0,0 +1,196 @@
+"""
+ذخیره‌گاه مشترک حافظه‌ی گفتگو: checkpointer گراف و قفل session بین worker ها
+
+- اگر CHECKPOINT_DB_URL با postgres شروع شود: PostgresSaver و advisory lock
+- در غیر این صورت: SQLite در حالت WAL و یک جدول قفل (session_locks)
+
+migration های Postgres فقط یک‌بار و پیش از بالا آمدن worker ها اجرا می‌شوند
+(setup_checkpoint_store)؛ هر worker فقط checkpointer را می‌سازد.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+from uuid import uuid4
+
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+DEFAULT_SQLITE_PATH = "langgraph_weaviate.db"
+# کلید advisory lock برای اجرای migration ها (یک عدد ثابت و دلخواه)
+SETUP_LOCK_KEY = 7_310_526
+
+
+def get_db_url() -> str:
+    return os.getenv("CHECKPOINT_DB_URL", DEFAULT_SQLITE_PATH)
+
+
+def is_postgres(db_url: str) -> bool:
+    return db_url.startswith(("postgres://", "postgresql://"))
+
+
+def _postgres_pool(db_url: str, max_size: int):
+    from psycopg_pool import ConnectionPool
+
+    return ConnectionPool(
+        conninfo=db_url,
+        min_size=1,
+        max_size=max_size,
+        kwargs={"autocommit": True, "prepare_threshold": 0},
+    )
+
+
+def _sqlite_connection(db_path: str, **kwargs) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30, **kwargs)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+
+# ==================== Checkpointer ====================
+
+def setup_checkpoint_store(db_url: Optional[str] = None):
+    """
+    ساخت جدول‌های checkpointer (فقط یک‌بار، پیش از اجرای worker ها)
+
+    روی Postgres زیر یک advisory lock اجرا می‌شود تا اگر چند پروسه هم‌زمان آن را
+    صدا بزنند، migration ها با هم مسابقه ندهند.
+    """
+    db_url = db_url or get_db_url()
+
+    if is_postgres(db_url):
+        import psycopg
+        from langgraph.checkpoint.postgres import PostgresSaver
+
+        with psycopg.connect(db_url, autocommit=True, prepare_threshold=0) as conn:
+            conn.execute("SELECT pg_advisory_lock(%s)", (SETUP_LOCK_KEY,))
+            try:
+                PostgresSaver(conn).setup()
+            finally:
+                conn.execute("SELECT pg_advisory_unlock(%s)", (SETUP_LOCK_KEY,))
+        print("🗄️ [MEMORY] جدول‌های Postgres checkpointer آماده است")
+        return
+
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    conn = _sqlite_connection(db_url)
+    try:
+        SqliteSaver(conn).setup()
+        SqliteSessionLocks.create_table(conn)
+    finally:
+        conn.close()
+    print(f"🗄️ [MEMORY] جدول‌های SQLite checkpointer آماده است: {db_url}")
+
+
+def build_checkpointer(db_url: Optional[str] = None):
+    """ساخت checkpointer مشترک برای حافظه‌ی گفتگو (بدون اجرای migration)"""
+    db_url = db_url or get_db_url()
+
+    if is_postgres(db_url):
+        from langgraph.checkpoint.postgres import PostgresSaver
+
+        pool = _postgres_pool(db_url, int(os.getenv("CHECKPOINT_POOL_SIZE", "10")))
+        print("🗄️ [MEMORY] Postgres checkpointer")
+        return PostgresSaver(pool)
+
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    print(f"🗄️ [MEMORY] SQLite checkpointer (WAL): {db_url}")
+    return SqliteSaver(_sqlite_connection(db_url))
+
+
+# ==================== قفل Session ====================
+
+class PostgresSessionLocks:
+    """
+    قفل هر session با pg_try_advisory_lock(hashtext(thread_id))
+
+    advisory lock به اتصال (connection) گره خورده است، پس اتصال تا پایان نوبت
+    نگه داشته می‌شود و همان به عنوان token برگردانده می‌شود. اگر worker از کار
+    بیفتد، Postgres با بسته شدن اتصال قفل را خودش آزاد می‌کند.
+    """
+
+    def __init__(self, db_url: str, pool_size: int):
+        self._pool = _postgres_pool(db_url, pool_size)
+
+    def try_acquire(self, session_id: str):
+        conn = self._pool.getconn()
+        try:
+            row = conn.execute("SELECT pg_try_advisory_lock(hashtext(%s))", (session_id,)).fetchone()
+        except Exception:
+            self._pool.putconn(conn)
+            raise
+        if not row[0]:
+            self._pool.putconn(conn)
+            return None
+        return conn
+
+    def release(self, session_id: str, token):
+        try:
+            token.execute("SELECT pg_advisory_unlock(hashtext(%s))", (session_id,))
+        except Exception as e:
+            # اتصالی که ممکن است هنوز قفل را داشته باشد نباید به pool برگردد
+            print(f"⚠️ [SESSION] آزاد کردن قفل {session_id} ناموفق بود: {str(e)}")
+            token.close()
+        finally:
+            self._pool.putconn(token)
+
+
+class SqliteSessionLocks:
+    """
+    قفل هر session با یک سطر در جدول session_locks (درج داخل BEGIN IMMEDIATE)
+
+    سطرهای قدیمی‌تر از stale_after ثانیه (مثلاً از worker ای که از کار افتاده)
+    نادیده گرفته و جایگزین می‌شوند.
+    """
+
+    def __init__(self, db_path: str, stale_after: float):
+        self.stale_after = stale_after
+        self._conn = _sqlite_connection(db_path, isolation_level=None)
+        self._lock = threading.Lock()
+        self.create_table(self._conn)
+
+    @staticmethod
+    def create_table(conn: sqlite3.Connection):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_locks ("
+            "thread_id TEXT PRIMARY KEY, token TEXT NOT NULL, acquired_at REAL NOT NULL)"
+        )
+        conn.commit()
+
+    def try_acquire(self, session_id: str):
+        token = str(uuid4())
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "DELETE FROM session_locks WHERE thread_id = ? AND acquired_at < ?",
+                    (session_id, now - self.stale_after),
+                )
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO session_locks (thread_id, token, acquired_at) VALUES (?, ?, ?)",
+                    (session_id, token, now),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return token if cursor.rowcount == 1 else None
+
+    def release(self, session_id: str, token):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM session_locks WHERE thread_id = ? AND token = ?", (session_id, token)
+            )
+
+
+def build_session_locks(stale_after: float, db_url: Optional[str] = None):
+    """قفل session در همان پایگاه داده‌ی checkpointer تا بین همه‌ی worker ها مشترک باشد"""
+    db_url = db_url or get_db_url()
+    if is_postgres(db_url):
+        return PostgresSessionLocks(db_url, int(os.getenv("SESSION_LOCK_POOL_SIZE", "20")))
+    return SqliteSessionLocks(db_url, stale_after)
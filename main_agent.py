@@ -1,176 +1,373 @@
-from typing import Annotated, TypedDict
+from typing import Annotated, Optional, TypedDict
+from collections import OrderedDict
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode, tools_condition
-from langgraph.checkpoint.sqlite import SqliteSaver
-from IPython.display import Image, display
 from langchain_openai import ChatOpenAI
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import StructuredTool
+from weaviate.classes.init import AdditionalConfig, Timeout
 from weaviate.classes.query import Filter
 from dotenv import load_dotenv
-import gradio as gr
+from checkpoint_store import build_checkpointer, build_session_locks, setup_checkpoint_store
+from resilience import CircuitBreaker, CircuitOpenError, Deadline, DeadlineExceeded, LatencyRecorder
 import requests
-import sqlite3
+import threading
+import time
 import os
 import weaviate
 import re
 
 load_dotenv(override=True)
 
-# ==================== 🔧 تابع جستجوی هوشمند ====================
-
-def intelligent_search(query: str, limit: int = 3) -> str:
-    """
-    جستجوی چندلایه: ابتدا Exact Match، سپس Metadata، آخر Semantic
-    
-    ✅ بدون تغییر - همان کد قبلی
-    """
-    print(f"\n{'=' * 60}")
-    print(f"🧠 [INTELLIGENT SEARCH] تحلیل کوئری: '{query}'")
-    print(f"{'=' * 60}\n")
-
-    client = weaviate.connect_to_local(host="localhost", port=8080)
-    questions = client.collections.get("Question")
-
-    section_patterns = {
-        r"بیاموز و بگو": "learn_and_say",
-        r"واژه\s*سازی": "word_formation",
-        r"بخوان و حفظ کن": "poem",
-        r"درست و نادرست|درست\s*نادرست": "exercise_true_false",
-        r"بازی": "game_activity",
-        r"گوش کن و بگو": "listen_and_speak",
-        r"فکر کن و بگو": "think_and_say",
-        r"پیدا کن و بگو": "find_and_say",
-        r"ایستگاه اندیشه": "thinking_station",
-        r"بخوان و بیندیش": "read_and_think",
-        r"شعر": "poem",
-        r"متن اصلی|داستان|متن": "main_story",
+# ==================== ⏱️ مهلت‌ها و Circuit Breaker ها ====================
+
+# کل زمان مجاز یک نوبت گفتگو (جستجو + LLM + ابزارها)
+TURN_TIMEOUT_SECONDS = float(os.getenv("TURN_TIMEOUT_SECONDS", "30"))
+# اگر کمتر از این مقدار زمان باقی مانده باشد، جستجوی معنایی (embedding با Ollama) انجام نمی‌شود
+SEMANTIC_MIN_SECONDS = float(os.getenv("SEMANTIC_MIN_SECONDS", "3"))
+# اگر کمتر از این مقدار زمان باقی مانده باشد، اصلاً سراغ Weaviate نمی‌رویم
+WEAVIATE_MIN_SECONDS = float(os.getenv("WEAVIATE_MIN_SECONDS", "0.5"))
+# سقف زمان هر فراخوانی LLM و ابزار تلگرام
+LLM_CALL_TIMEOUT_SECONDS = float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", "20"))
+# اگر فراخوانی LLM با کمتر از این مقدار زمان باقی‌مانده شروع شود، شکستش به حساب llm_breaker گذاشته نمی‌شود
+LLM_MIN_SECONDS = float(os.getenv("LLM_MIN_SECONDS", "5"))
+TELEGRAM_TIMEOUT_SECONDS = float(os.getenv("TELEGRAM_TIMEOUT_SECONDS", "5"))
+
+# بعد از CIRCUIT_FAILURE_THRESHOLD خطای پشت‌سرهم، سرویس تا CIRCUIT_RESET_SECONDS ثانیه صدا زده نمی‌شود
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+weaviate_breaker = CircuitBreaker("weaviate", CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS)
+ollama_breaker = CircuitBreaker("ollama", CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS)
+llm_breaker = CircuitBreaker("llm", CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS)
+
+turn_latency = LatencyRecorder()
+
+
+def turn_config(thread_id: str, timeout: Optional[float] = None, request_id: Optional[str] = None) -> dict:
+    """config یک نوبت: thread_id برای حافظه و مهلت مطلق برای همه‌ی node ها"""
+    config = {
+        "configurable": {
+            "thread_id": thread_id,
+            Deadline.CONFIG_KEY: time.time() + (timeout or TURN_TIMEOUT_SECONDS),
+        }
     }
+    if request_id:
+        config["metadata"] = {"request_id": request_id}
+    return config
+
+
+# ==================== 🔌 اتصال به Weaviate ====================
+
+def connect_weaviate(deadline: Optional[Deadline] = None):
+    """اتصال به Weaviate محلی (در تست بار با نسخه‌ی جعلی جایگزین می‌شود)"""
+    deadline = deadline or Deadline.after(TURN_TIMEOUT_SECONDS)
+    timeout = deadline.timeout(stage="weaviate")
+    return weaviate.connect_to_local(
+        host=os.getenv("WEAVIATE_HOST", "localhost"),
+        port=int(os.getenv("WEAVIATE_PORT", "8080")),
+        additional_config=AdditionalConfig(
+            timeout=Timeout(init=min(timeout, 2), query=timeout, insert=timeout)
+        ),
+    )
+
 
+# ==================== 🧭 تحلیل کوئری ====================
+
+SECTION_PATTERNS = {
+    r"بیاموز و بگو": "learn_and_say",
+    r"واژه\s*سازی": "word_formation",
+    r"بخوان و حفظ کن": "poem",
+    r"درست و نادرست|درست\s*نادرست": "exercise_true_false",
+    r"بازی": "game_activity",
+    r"گوش کن و بگو": "listen_and_speak",
+    r"فکر کن و بگو": "think_and_say",
+    r"پیدا کن و بگو": "find_and_say",
+    r"ایستگاه اندیشه": "thinking_station",
+    r"بخوان و بیندیش": "read_and_think",
+    r"شعر": "poem",
+    r"متن اصلی|داستان|متن": "main_story",
+}
+
+PERSIAN_TO_NUM = {
+    "اول": "01", "یک": "01", "۱": "01",
+    "دوم": "02", "دو": "02", "۲": "02",
+    "سوم": "03", "سه": "03", "۳": "03",
+    "چهارم": "04", "چهار": "04", "۴": "04",
+    "پنجم": "05", "پنج": "05", "۵": "05",
+    "ششم": "06", "شش": "06", "۶": "06",
+    "هفتم": "07", "هفت": "07", "۷": "07",
+    "هشتم": "08", "هشت": "08", "۸": "08",
+    "نهم": "09", "نه": "09", "۹": "09",
+    "دهم": "10", "ده": "10", "۱۰": "10",
+    "یازدهم": "11", "یازده": "11", "۱۱": "11",
+    "دوازدهم": "12", "دوازده": "12", "۱۲": "12",
+    "سیزدهم": "13", "سیزده": "13", "۱۳": "13",
+    "چهاردهم": "14", "چهارده": "14", "۱۴": "14",
+    "پانزدهم": "15", "پانزده": "15", "۱۵": "15",
+    "شانزدهم": "16", "شانزده": "16", "۱۶": "16",
+    "هفدهم": "17", "هفده": "17", "۱۷": "17",
+}
+
+
+def analyze_query(query: str):
+    """تشخیص شماره درس و نوع بخش از متن کوئری"""
     lesson_match = re.search(r"درس\s+(\S+)", query)
     lesson_number = None
     if lesson_match:
         lesson_text = lesson_match.group(1)
-        persian_to_num = {
-            "اول": "01", "یک": "01", "۱": "01",
-            "دوم": "02", "دو": "02", "۲": "02",
-            "سوم": "03", "سه": "03", "۳": "03",
-            "چهارم": "04", "چهار": "04", "۴": "04",
-            "پنجم": "05", "پنج": "05", "۵": "05",
-            "ششم": "06", "شش": "06", "۶": "06",
-            "هفتم": "07", "هفت": "07", "۷": "07",
-            "هشتم": "08", "هشت": "08", "۸": "08",
-            "نهم": "09", "نه": "09", "۹": "09",
-            "دهم": "10", "ده": "10", "۱۰": "10",
-            "یازدهم": "11", "یازده": "11", "۱۱": "11",
-            "دوازدهم": "12", "دوازده": "12", "۱۲": "12",
-            "سیزدهم": "13", "سیزده": "13", "۱۳": "13",
-            "چهاردهم": "14", "چهارده": "14", "۱۴": "14",
-            "پانزدهم": "15", "پانزده": "15", "۱۵": "15",
-            "شانزدهم": "16", "شانزده": "16", "۱۶": "16",
-            "هفدهم": "17", "هفده": "17", "۱۷": "17",
-        }
-        lesson_number = persian_to_num.get(lesson_text, lesson_text.zfill(2))
+        lesson_number = PERSIAN_TO_NUM.get(lesson_text, lesson_text.zfill(2))
         print(f"📚 [ANALYSIS] درس شناسایی شد: {lesson_number}")
 
     detected_section = None
-    for pattern, section_type in section_patterns.items():
+    for pattern, section_type in SECTION_PATTERNS.items():
         if re.search(pattern, query, re.IGNORECASE):
             detected_section = section_type
             print(f"🎯 [ANALYSIS] بخش شناسایی شد: {section_type}")
             break
 
-    results = []
-    search_strategy = "semantic"
-
-    if lesson_number and detected_section:
-        search_strategy = "exact_match"
-        print(f"\n🎯 [STRATEGY] استراتژی: Exact Match (درس={lesson_number}, بخش={detected_section})\n")
-        response = questions.query.fetch_objects(
-            filters=(
-                Filter.by_property("source").equal(f"lesson_{lesson_number}")
-                & Filter.by_property("section_type").equal(detected_section)
-            ),
-            limit=limit,
-        )
-        results = response.objects
-
-    elif lesson_number:
-        search_strategy = "filtered_semantic"
-        print(f"\n🔍 [STRATEGY] استراتژی: Filtered Semantic (درس={lesson_number})\n")
-        response = questions.query.near_text(
-            query=query,
-            filters=Filter.by_property("source").equal(f"lesson_{lesson_number}"),
-            limit=limit,
-            return_metadata=["distance"],
-        )
-        results = response.objects
-
-    elif detected_section:
-        search_strategy = "type_filtered_semantic"
-        print(f"\n🔍 [STRATEGY] استراتژی: Type Filtered Semantic (بخش={detected_section})\n")
-        response = questions.query.near_text(
-            query=query,
-            filters=Filter.by_property("section_type").equal(detected_section),
-            limit=limit,
-            return_metadata=["distance"],
-        )
-        results = response.objects
+    return lesson_number, detected_section
 
-    else:
-        search_strategy = "pure_semantic"
-        print(f"\n🔍 [STRATEGY] استراتژی: Pure Semantic Search\n")
-        response = questions.query.near_text(
-            query=query, limit=limit, return_metadata=["distance"]
-        )
-        results = response.objects
 
-    print(f"📦 [RESULTS] {len(results)} نتیجه با استراتژی '{search_strategy}' پیدا شد\n")
+# ==================== 🛟 مسیرهای جایگزین (Fallback) ====================
 
-    if not results:
-        print("❌ نتیجه‌ای پیدا نشد\n")
-        client.close()
+_local_index = None
+_local_index_lock = threading.Lock()
+
+_search_cache = OrderedDict()
+_search_cache_lock = threading.Lock()
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "256"))
+
+
+def get_local_index() -> dict:
+    """
+    ایندکس Exact Match محلی: (منبع، نوع بخش) -> محتواها
+
+    مستقیم از فایل‌های lessons ساخته می‌شود و به Weaviate یا Ollama نیازی ندارد.
+    """
+    global _local_index
+    with _local_index_lock:
+        if _local_index is None:
+            from setup_weaviate import iter_lesson_chunks
+
+            index = {}
+            lessons_dir = "./lessons"
+            lesson_files = os.listdir(lessons_dir) if os.path.exists(lessons_dir) else []
+            for lesson_file in sorted(lesson_files):
+                if not lesson_file.endswith(".txt"):
+                    continue
+                source = os.path.splitext(lesson_file)[0]
+                for chunk in iter_lesson_chunks(os.path.join(lessons_dir, lesson_file)):
+                    index.setdefault((source, chunk["section_type"]), []).append(chunk["content"])
+            _local_index = index
+            print(f"🗂️ [LOCAL INDEX] {len(index)} کلید از فایل‌های درس ساخته شد")
+        return _local_index
+
+
+# ایندکس محلی هنگام بالا آمدن پروسه ساخته می‌شود تا مسیر جایگزین (که فقط زیر فشار
+# زمانی اجرا می‌شود) هرگز هزینه‌ی خواندن فایل‌ها را نپردازد
+get_local_index()
+
+
+def _cache_key(query: str, limit: int) -> tuple:
+    return " ".join(query.split()), limit
+
+
+def cache_search_result(query: str, limit: int, output: str):
+    with _search_cache_lock:
+        _search_cache[_cache_key(query, limit)] = output
+        _search_cache.move_to_end(_cache_key(query, limit))
+        while len(_search_cache) > SEARCH_CACHE_SIZE:
+            _search_cache.popitem(last=False)
+
+
+def get_cached_search_result(query: str, limit: int) -> Optional[str]:
+    with _search_cache_lock:
+        return _search_cache.get(_cache_key(query, limit))
+
+
+def degraded_search(query: str, limit: int, lesson_number: Optional[str], detected_section: Optional[str]) -> str:
+    """جستجوی ارزان وقتی Weaviate در دسترس نیست یا زمان کافی نمانده: ایندکس محلی ← کش ← بدون context"""
+    if lesson_number:
+        section_type = detected_section or "main_story"
+        contents = get_local_index().get((f"lesson_{lesson_number}", section_type), [])[:limit]
+        if contents:
+            print(f"🛟 [FALLBACK] ایندکس محلی: {len(contents)} نتیجه")
+            parts = ["📌 **نتایج:**\n"] + [
+                f"**بخش {i + 1}** ({section_type} - lesson_{lesson_number}):\n{content}\n"
+                for i, content in enumerate(contents)
+            ]
+            return "\n---\n".join(parts)
+
+    cached = get_cached_search_result(query, limit)
+    if cached:
+        print("🛟 [FALLBACK] نتیجه از کش")
+        return cached
+
+    print("🛟 [FALLBACK] بدون context")
+    return "⚠️ جستجو در زمان مجاز انجام نشد. بدون نتایج جستجو و با احتیاط پاسخ بده."
+
+
+# ==================== 🔧 تابع جستجوی هوشمند ====================
+
+def intelligent_search(query: str, limit: int = 3, deadline: Optional[Deadline] = None) -> str:
+    """
+    جستجوی چندلایه: ابتدا Exact Match، سپس Metadata، آخر Semantic
+
+    اگر مهلت نوبت نزدیک باشد یا Weaviate/Ollama خطا بدهند، به جای شکست کل
+    نوبت به degraded_search برمی‌گردد.
+    """
+    deadline = deadline or Deadline.after(TURN_TIMEOUT_SECONDS)
+
+    print(f"\n{'=' * 60}")
+    print(f"🧠 [INTELLIGENT SEARCH] تحلیل کوئری: '{query}'")
+    print(f"{'=' * 60}\n")
+
+    lesson_number, detected_section = analyze_query(query)
+    needs_embedding = not (lesson_number and detected_section)
+    remaining = deadline.remaining()
+
+    if remaining < WEAVIATE_MIN_SECONDS or not weaviate_breaker.is_available():
+        print(f"⏱️ [DEGRADE] Weaviate رد شد (زمان باقی‌مانده={remaining:.1f}s, circuit={weaviate_breaker.state})")
+        return degraded_search(query, limit, lesson_number, detected_section)
+
+    if needs_embedding and (remaining < SEMANTIC_MIN_SECONDS or not ollama_breaker.is_available()):
+        print(f"⏱️ [DEGRADE] جستجوی معنایی رد شد (زمان باقی‌مانده={remaining:.1f}s, circuit={ollama_breaker.state})")
+        return degraded_search(query, limit, lesson_number, detected_section)
+
+    try:
+        output = search_weaviate(query, limit, lesson_number, detected_section, deadline)
+    except (DeadlineExceeded, CircuitOpenError) as e:
+        print(f"⏱️ [DEGRADE] {str(e)}")
+        return degraded_search(query, limit, lesson_number, detected_section)
+    except Exception as e:
+        print(f"❌ [SEARCH] خطا: {str(e)}")
+        return degraded_search(query, limit, lesson_number, detected_section)
+
+    if output is None:
         return f"❌ نتیجه‌ای برای '{query}' پیدا نشد."
 
-    formatted_results = []
-    related_ids = set()
+    cache_search_result(query, limit, output)
+    return output
 
-    for idx, obj in enumerate(results, 1):
-        distance = obj.metadata.distance if hasattr(obj.metadata, "distance") else "N/A"
-        chunk_data = {
-            "content": obj.properties.get("content", ""),
-            "section_type": obj.properties.get("section_type", "unknown"),
-            "source": obj.properties.get("source", ""),
-            "chunk_id": obj.properties.get("chunk_id", ""),
-        }
-        formatted_results.append(chunk_data)
-
-        print(f"📄 [CHUNK {idx}] ✅ MATCHED")
-        print(f"   ├─ نوع: {chunk_data['section_type']}")
-        print(f"   ├─ منبع: {chunk_data['source']}")
-        print(f"   ├─ فاصله: {distance}")
-        print(f"   └─ محتوا: {chunk_data['content'][:80]}...\n")
-
-        related = obj.properties.get("related_chunks", [])
-        if related:
-            related_ids.update(related)
-
-    if related_ids:
-        print(f"🔗 [RELATED] بازیابی {len(related_ids)} چانک مرتبط...\n")
-        for related_id in related_ids:
-            related_response = questions.query.fetch_objects(
-                filters=Filter.by_property("chunk_id").equal(related_id), limit=1
+
+def search_weaviate(query: str, limit: int, lesson_number: Optional[str], detected_section: Optional[str], deadline: Deadline) -> Optional[str]:
+    """
+    اجرای استراتژی جستجو روی Weaviate
+
+    خطای اتصال و fetch_objects روی weaviate_breaker و خطای near_text
+    (که embedding آن توسط Ollama ساخته می‌شود) روی ollama_breaker ثبت می‌شود.
+    """
+    client = weaviate_breaker.call_with_deadline(deadline, WEAVIATE_MIN_SECONDS, connect_weaviate, deadline)
+    try:
+        questions = client.collections.get("Question")
+        results = []
+        search_strategy = "semantic"
+
+        if lesson_number and detected_section:
+            search_strategy = "exact_match"
+            print(f"\n🎯 [STRATEGY] استراتژی: Exact Match (درس={lesson_number}, بخش={detected_section})\n")
+            response = weaviate_breaker.call_with_deadline(
+                deadline, WEAVIATE_MIN_SECONDS,
+                questions.query.fetch_objects,
+                filters=(
+                    Filter.by_property("source").equal(f"lesson_{lesson_number}")
+                    & Filter.by_property("section_type").equal(detected_section)
+                ),
+                limit=limit,
+            )
+            results = response.objects
+
+        elif lesson_number:
+            search_strategy = "filtered_semantic"
+            print(f"\n🔍 [STRATEGY] استراتژی: Filtered Semantic (درس={lesson_number})\n")
+            response = ollama_breaker.call_with_deadline(
+                deadline, SEMANTIC_MIN_SECONDS,
+                questions.query.near_text,
+                query=query,
+                filters=Filter.by_property("source").equal(f"lesson_{lesson_number}"),
+                limit=limit,
+                return_metadata=["distance"],
+            )
+            results = response.objects
+
+        elif detected_section:
+            search_strategy = "type_filtered_semantic"
+            print(f"\n🔍 [STRATEGY] استراتژی: Type Filtered Semantic (بخش={detected_section})\n")
+            response = ollama_breaker.call_with_deadline(
+                deadline, SEMANTIC_MIN_SECONDS,
+                questions.query.near_text,
+                query=query,
+                filters=Filter.by_property("section_type").equal(detected_section),
+                limit=limit,
+                return_metadata=["distance"],
             )
-            if related_response.objects:
-                obj = related_response.objects[0]
-                formatted_results.append({
-                    "content": obj.properties.get("content", ""),
-                    "section_type": obj.properties.get("section_type", "unknown"),
-                    "source": obj.properties.get("source", ""),
-                    "is_related": True,
-                })
+            results = response.objects
 
-    client.close()
+        else:
+            search_strategy = "pure_semantic"
+            print(f"\n🔍 [STRATEGY] استراتژی: Pure Semantic Search\n")
+            response = ollama_breaker.call_with_deadline(
+                deadline, SEMANTIC_MIN_SECONDS,
+                questions.query.near_text,
+                query=query, limit=limit, return_metadata=["distance"]
+            )
+            results = response.objects
+
+        print(f"📦 [RESULTS] {len(results)} نتیجه با استراتژی '{search_strategy}' پیدا شد\n")
+
+        if not results:
+            print("❌ نتیجه‌ای پیدا نشد\n")
+            return None
+
+        formatted_results = []
+        related_ids = set()
+
+        for idx, obj in enumerate(results, 1):
+            distance = obj.metadata.distance if hasattr(obj.metadata, "distance") else "N/A"
+            chunk_data = {
+                "content": obj.properties.get("content", ""),
+                "section_type": obj.properties.get("section_type", "unknown"),
+                "source": obj.properties.get("source", ""),
+                "chunk_id": obj.properties.get("chunk_id", ""),
+            }
+            formatted_results.append(chunk_data)
+
+            print(f"📄 [CHUNK {idx}] ✅ MATCHED")
+            print(f"   ├─ نوع: {chunk_data['section_type']}")
+            print(f"   ├─ منبع: {chunk_data['source']}")
+            print(f"   ├─ فاصله: {distance}")
+            print(f"   └─ محتوا: {chunk_data['content'][:80]}...\n")
+
+            related = obj.properties.get("related_chunks", [])
+            if related:
+                related_ids.update(related)
+
+        # چانک‌های مرتبط اختیاری هستند: اگر زمان نمانده باشد، نتایج اصلی کافی است
+        if related_ids and deadline.remaining() >= WEAVIATE_MIN_SECONDS:
+            print(f"🔗 [RELATED] بازیابی {len(related_ids)} چانک مرتبط...\n")
+            try:
+                related_response = weaviate_breaker.call_with_deadline(
+                    deadline, WEAVIATE_MIN_SECONDS,
+                    questions.query.fetch_objects,
+                    filters=Filter.any_of([
+                        Filter.by_property("chunk_id").equal(related_id) for related_id in related_ids
+                    ]),
+                    limit=len(related_ids),
+                )
+                for obj in related_response.objects:
+                    formatted_results.append({
+                        "content": obj.properties.get("content", ""),
+                        "section_type": obj.properties.get("section_type", "unknown"),
+                        "source": obj.properties.get("source", ""),
+                        "is_related": True,
+                    })
+            except Exception as e:
+                print(f"⚠️ [RELATED] رد شد: {str(e)}\n")
+    finally:
+        client.close()
 
     main = [r for r in formatted_results if not r.get("is_related")]
     related = [r for r in formatted_results if r.get("is_related")]
@@ -194,17 +391,20 @@ def intelligent_search(query: str, limit: int = 3) -> str:
 
 # ==================== Telegram Tool ====================
 
-def send_telegram_message(message: str) -> str:
+def send_telegram_message(message: str, deadline: Optional[Deadline] = None) -> str:
     """ارسال پیام از طریق ربات تلگرام"""
     print(f"\n📱 [TELEGRAM] ارسال پیام: {message[:50]}...")
 
+    deadline = deadline or Deadline.after(TELEGRAM_TIMEOUT_SECONDS)
     bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
     chat_id = os.getenv("TELEGRAM_CHAT_ID")
     url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
 
     try:
         response = requests.post(
-            url, json={"chat_id": chat_id, "text": message, "parse_mode": "HTML"}
+            url,
+            json={"chat_id": chat_id, "text": message, "parse_mode": "HTML"},
+            timeout=deadline.timeout(cap=TELEGRAM_TIMEOUT_SECONDS, stage="telegram"),
         )
 
         if response.status_code == 200:
@@ -220,9 +420,22 @@ def send_telegram_message(message: str) -> str:
 
 # ==================== Tool Definitions ====================
 
+# config گراف به صورت خودکار به ابزارها تزریق می‌شود (در schema مدل دیده نمی‌شود)
+def semantic_search_tool(query: str, config: RunnableConfig, limit: int = 3) -> str:
+    return intelligent_search(
+        query, limit=limit, deadline=Deadline.from_config(config, TURN_TIMEOUT_SECONDS)
+    )
+
+
+def send_telegram_tool(message: str, config: RunnableConfig) -> str:
+    return send_telegram_message(
+        message, deadline=Deadline.from_config(config, TURN_TIMEOUT_SECONDS)
+    )
+
+
 tool_weaviate = StructuredTool.from_function(
     name="semantic_search",
-    func=intelligent_search,
+    func=semantic_search_tool,
     description="""
     ابزار تخصصی و ضروری برای جستجوی معنایی در پایگاه داده دروس فارسی کلاس دوم.
 
@@ -241,7 +454,7 @@ tool_weaviate = StructuredTool.from_function(
 
 tool_telegram = StructuredTool.from_function(
     name="send_telegram_message",
-    func=send_telegram_message,
+    func=send_telegram_tool,
     description="""ارسال پیام از طریق تلگرام برای اطلاع‌رسانی فوری""",
 )
 
@@ -298,9 +511,11 @@ class State(TypedDict):
     messages: Annotated[list, add_messages]
 
 
-db_path = "langgraph_weaviate.db"
-conn = sqlite3.connect(db_path, check_same_thread=False)
-sql_memory = SqliteSaver(conn)
+checkpointer = build_checkpointer()
+# قفل هر session در همان پایگاه داده‌ی checkpointer تا دو نوبت هم‌زمان (حتی روی دو worker)
+# از یک checkpoint والد شروع نکنند؛ سطر قفل SQLite بعد از این مدت کهنه حساب می‌شود
+SESSION_LOCK_STALE_SECONDS = float(os.getenv("SESSION_LOCK_STALE_SECONDS", "300"))
+session_locks = build_session_locks(SESSION_LOCK_STALE_SECONDS)
 
 MODEL_NAME = "gpt-4o-mini"
 llm = ChatOpenAI(
@@ -308,6 +523,9 @@ llm = ChatOpenAI(
     api_key=os.getenv("METIS_API_KEY"),
     model=MODEL_NAME,
     temperature=0.3,
+    timeout=LLM_CALL_TIMEOUT_SECONDS,
+    # هر تلاش دوباره مهلت کامل می‌گیرد و از مهلت نوبت بیرون می‌زند؛ پس بدون retry
+    max_retries=0,
 )
 
 llm_with_tools = llm.bind_tools(tools)
@@ -365,7 +583,7 @@ def route_after_start(state: State) -> str:
         return "skip_search"
 
 
-def mandatory_search(state: State):
+def mandatory_search(state: State, config: RunnableConfig):
     """
     ?📌 تغییر اصلی #2: اضافه کردن نشانگر "ephemeral" به context
     
@@ -392,7 +610,8 @@ def mandatory_search(state: State):
     print(f"💬 [USER INPUT] سوال کاربر: '{last_user_message}'")
     print(f"{'🔄' * 30}")
 
-    search_result = intelligent_search(last_user_message, limit=3)
+    deadline = Deadline.from_config(config, TURN_TIMEOUT_SECONDS)
+    search_result = intelligent_search(last_user_message, limit=3, deadline=deadline)
 
     # 🆕 اضافه کردن metadata برای شناسایی context موقت
     from langchain_core.messages import SystemMessage
@@ -407,8 +626,12 @@ def mandatory_search(state: State):
     return {"messages": [context_message]}
 
 
-def chatbot(state: State):
+DEGRADED_REPLY = "ببخشید، الان نمی‌توانم جواب بدهم. لطفاً چند لحظه‌ی دیگر دوباره بپرس. 🙏"
+
+
+def chatbot(state: State, config: RunnableConfig):
     messages = state["messages"]
+    deadline = Deadline.from_config(config, TURN_TIMEOUT_SECONDS)
 
     # 1. پیام‌های خام را فیلتر می‌کند (Context RAG حذف می‌شود، تاریخچه قدیمی برش می‌خورد)
     filtered_msgs = filter_messages_for_llm(messages, max_pairs=5)
@@ -417,9 +640,19 @@ def chatbot(state: State):
     from langchain_core.messages import SystemMessage
     final_messages = [SystemMessage(content=SYSTEM_PROMPT)] + filtered_msgs
     
-    # 3. به LLM ارسال می‌شود
-    response = llm_with_tools.invoke(final_messages)
-    
+    # 3. به LLM ارسال می‌شود (با سقف زمانی برابر با زمان باقی‌مانده‌ی نوبت)
+    try:
+        response = llm_breaker.call_with_deadline(
+            deadline, LLM_MIN_SECONDS,
+            llm_with_tools.invoke,
+            final_messages,
+            timeout=deadline.timeout(cap=LLM_CALL_TIMEOUT_SECONDS, stage="llm"),
+        )
+    except Exception as e:
+        # پاسخ جایگزین ephemeral است تا در تاریخچه‌ی بعدی به مدل ارسال نشود
+        print(f"⏱️ [DEGRADE] LLM رد شد: {str(e)}")
+        response = AIMessage(content=DEGRADED_REPLY, additional_kwargs={"ephemeral": True})
+
     return {"messages": [response]}
 
 
@@ -437,30 +670,23 @@ graph_builder.add_edge("mandatory_search", "chatbot")
 graph_builder.add_conditional_edges("chatbot", tools_condition)
 graph_builder.add_edge("tools", "chatbot")
 
-graph = graph_builder.compile(checkpointer=sql_memory)
-
-try:
-    display(Image(graph.get_graph().draw_mermaid_png()))
-except:
-    print("⚠️ نمودار گراف قابل نمایش نیست")
+graph = graph_builder.compile(checkpointer=checkpointer)
 
 
 # ==================== Gradio Interface ====================
 
-config = {"configurable": {"thread_id": "1"}}
-
-
 def chat(user_input: str, history):
     """
-    ✅ بدون تغییر - همان کد قبلی
+    هر نوبت یک مهلت (TURN_TIMEOUT_SECONDS) دارد که به همه‌ی node ها و ابزارها می‌رسد
     """
+    started = time.perf_counter()
     try:
         print(f"\n{'🎯' * 30}")
         print(f"🚀 [SESSION START] شروع پردازش درخواست جدید")
         print(f"{'🎯' * 30}\n")
 
         result = graph.invoke(
-            {"messages": [{"role": "user", "content": user_input}]}, config=config
+            {"messages": [{"role": "user", "content": user_input}]}, config=turn_config("1")
         )
 
         final_response = result["messages"][-1].content
@@ -474,9 +700,22 @@ def chat(user_input: str, history):
     except Exception as e:
         print(f"\n❌ [ERROR] خطای کلی: {str(e)}\n")
         return f"❌ خطا: {str(e)}"
+    finally:
+        turn_latency.record((time.perf_counter() - started) * 1000)
+        print(f"⏱️ [LATENCY] {turn_latency.percentiles()}")
 
 
 if __name__ == "__main__":
+    import gradio as gr
+
+    setup_checkpoint_store()
+
+    try:
+        from IPython.display import Image, display
+        display(Image(graph.get_graph().draw_mermaid_png()))
+    except:
+        print("⚠️ نمودار گراف قابل نمایش نیست")
+
     interface = gr.ChatInterface(
         chat,
         type="messages",
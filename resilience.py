@@ -0,0 +1,181 @@
+"""
+ابزارهای مقاومت در برابر کندی و خطا: مهلت هر نوبت، circuit breaker و ثبت تأخیر
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+
+class DeadlineExceeded(Exception):
+    """مهلت نوبت فعلی تمام شده است"""
+
+
+class CircuitOpenError(Exception):
+    """circuit breaker باز است و فراخوانی انجام نمی‌شود"""
+
+
+# ==================== Deadline ====================
+
+class Deadline:
+    """
+    مهلت یک نوبت گفتگو به صورت زمان مطلق (epoch)
+
+    زمان مطلق استفاده می‌شود تا بتوان آن را در config گراف (configurable)
+    قرار داد و بین همه‌ی node ها و ابزارها دست‌به‌دست کرد.
+    """
+
+    CONFIG_KEY = "turn_deadline"
+
+    def __init__(self, expires_at: float):
+        self.expires_at = expires_at
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(time.time() + seconds)
+
+    @classmethod
+    def from_config(cls, config: Optional[dict], default_seconds: float) -> "Deadline":
+        expires_at = ((config or {}).get("configurable") or {}).get(cls.CONFIG_KEY)
+        if expires_at is None:
+            return cls.after(default_seconds)
+        return cls(float(expires_at))
+
+    def remaining(self) -> float:
+        return self.expires_at - time.time()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: Optional[float] = None, stage: str = "") -> float:
+        """زمان باقی‌مانده برای یک فراخوانی (حداکثر cap)؛ اگر تمام شده باشد خطا می‌دهد"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"مهلت نوبت تمام شد{f' ({stage})' if stage else ''}")
+        return min(remaining, cap) if cap else remaining
+
+
+# ==================== Circuit Breaker ====================
+
+class CircuitBreaker:
+    """
+    بعد از failure_threshold خطای پشت‌سرهم باز می‌شود و تا reset_timeout ثانیه
+    فراخوانی‌ها را فوراً رد می‌کند. سپس یک فراخوانی آزمایشی (half-open) اجازه
+    می‌گیرد؛ موفقیت آن مدار را می‌بندد و شکستش دوباره بازش می‌کند.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def is_available(self) -> bool:
+        """آیا الان می‌توان فراخوانی کرد؟ (بدون رزرو فراخوانی آزمایشی)"""
+        with self._lock:
+            state = self._state()
+            return state == "closed" or (state == "half_open" and not self._trial_in_flight)
+
+    def before_call(self):
+        with self._lock:
+            state = self._state()
+            if state == "open" or (state == "half_open" and self._trial_in_flight):
+                raise CircuitOpenError(f"circuit '{self.name}' باز است")
+            if state == "half_open":
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            was_trial = self._trial_in_flight
+            self._trial_in_flight = False
+            if was_trial or self._failures >= self.failure_threshold:
+                if self._opened_at is None or was_trial:
+                    print(f"🔌 [CIRCUIT] '{self.name}' باز شد ({self._failures} خطا)")
+                self._opened_at = time.monotonic()
+
+    def call(self, func, *args, **kwargs):
+        return self._call(func, args, kwargs, starved=False)
+
+    def call_with_deadline(self, deadline: "Deadline", min_budget: float, func, *args, **kwargs):
+        """
+        مثل call، اما اگر زمان باقی‌مانده‌ی نوبت در لحظه‌ی فراخوانی کمتر از min_budget
+        بوده باشد، شکست (مثلاً timeout) به حساب سرویس گذاشته نمی‌شود
+        """
+        starved = deadline.remaining() < min_budget
+        return self._call(func, args, kwargs, starved=starved)
+
+    def _release_trial(self):
+        with self._lock:
+            self._trial_in_flight = False
+
+    def _call(self, func, args, kwargs, starved: bool):
+        self.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except DeadlineExceeded:
+            # تمام شدن مهلت نوبت تقصیر سرویس نیست و خطا حساب نمی‌شود
+            self._release_trial()
+            raise
+        except Exception:
+            if starved:
+                print(f"⏱️ [CIRCUIT] خطای '{self.name}' با بودجه‌ی زمانی ناکافی؛ شمرده نشد")
+                self._release_trial()
+            else:
+                self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+
+# ==================== Latency ====================
+
+class LatencyRecorder:
+    """نگه‌داری آخرین نمونه‌های تأخیر (میلی‌ثانیه) و محاسبه‌ی صدک‌ها"""
+
+    def __init__(self, max_samples: int = 1000):
+        self._samples = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    def record(self, milliseconds: float):
+        with self._lock:
+            self._samples.append(milliseconds)
+
+    def percentiles(self) -> dict:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {"count": 0}
+
+        def pick(p: float) -> float:
+            return round(samples[min(len(samples) - 1, int(p / 100 * len(samples)))], 1)
+
+        return {
+            "count": len(samples),
+            "p50": pick(50),
+            "p95": pick(95),
+            "p99": pick(99),
+            "max": round(samples[-1], 1),
+        }
@@ -4,200 +4,308 @@
 """
 
 import weaviate
+import argparse
+import json
+import mmap
 import os
 import re
-from typing import List
+import time
+from typing import Iterable, Iterator, List, Optional, Tuple
 from uuid import uuid4
+from dotenv import load_dotenv
 from weaviate.classes.config import Configure, Property, DataType
 
+load_dotenv(override=True)
+
+COLLECTION_NAME = "Question"
+OLLAMA_ENDPOINT = "http://host.docker.internal:11434"
+EMBEDDING_MODEL = "bge-m3:latest"
+
+
+# ==================== جدول قواعد تشخیص بخش ====================
+
+# (الگو، نوع بخش، اهمیت، آیا بخش جدیدی شروع می‌شود؟)
+# ترتیب قواعد مهم است: اولین قاعده‌ی منطبق برنده است
+SECTION_RULES = [
+    (re.compile(r"^فصل"), "chapter_title", "high", True),
+    (re.compile(r"درس\s+\S+"), "lesson_title", "high", True),
+    # «نادرست» خودش شامل «درست» است، پس یک الگو کافی است
+    (re.compile(r"نادرست"), "exercise_true_false", "medium", False),
+    (re.compile(r"گوش کن و بگو"), "listen_and_speak", "medium", False),
+    (re.compile(r"پیدا کن و بگو"), "find_and_say", "medium", False),
+    (re.compile(r"فکر کن و بگو"), "think_and_say", "medium", False),
+    (re.compile(r"ایستگاه اندیشه"), "thinking_station", "high", False),
+    (re.compile(r"بخوان و بیندیش"), "read_and_think", "high", False),
+    (re.compile(r"واژه[ \u200c]سازی"), "word_formation", "high", False),
+    (re.compile(r"بیاموز و بگو"), "learn_and_say", "high", False),
+    (re.compile(r"بازی"), "game_activity", "medium", False),
+    (re.compile(r"بخوان و حفظ کن"), "poem", "high", False),
+]
+
+# سرتیتر واقعی فصل/درس (اول خط)؛ فقط این خطوط گروه روابط را می‌بندند. قاعده‌ی lesson_title
+# بالا عمداً anchor ندارد و هر خطی که «درس» دارد را بخش جدید می‌کند، اما یک جمله مثل
+# «از این درس یاد گرفتیم ...» نباید روابط تمرین‌های بعدی با متن اصلی را قطع کند
+LESSON_HEADER_PATTERN = re.compile(r"^(فصل|درس)\s")
+
+# نوع بخش -> نوع بخشی که باید به آن ارجاع دهد
+RELATION_RULES = {
+    "exercise_true_false": "main_story",
+    "listen_and_speak": "main_story",
+    "find_and_say": "main_story",
+    "think_and_say": "main_story",
+    "thinking_station": "read_and_think",
+}
+
+MIN_SECTION_LENGTH = 10
+MAIN_STORY_MIN_LINE_LENGTH = 50
+
+
+def classify_line(line: str):
+    """اولین قاعده‌ی منطبق از SECTION_RULES یا None"""
+    for rule in SECTION_RULES:
+        if rule[0].search(line):
+            return rule
+    return None
+
 
 # ==================== تابع چانک کردن پیشرفته ====================
 
-def chunk_by_semantic_sections(text: str, lesson_name: str = "unknown") -> List[dict]:
-    """تقسیم متن درس بر اساس ساختار معنایی و ارتباط بین بخش‌ها"""
-    
-    chunks = []
-    lines = text.strip().split('\n')
-    
+def iter_sections(lines: Iterable[str]) -> Iterator[Tuple[str, str, str, bool]]:
+    """
+    تقسیم جریانی خطوط درس به بخش‌ها
+
+    خروجی: (محتوا، نوع بخش، اهمیت، آیا با سرتیتر فصل/درس شروع شده؟) برای هر بخش،
+    به همان ترتیب متن
+    """
     current_section = []
+    current_length = -1  # طول '\n'.join(current_section) بدون ساختن رشته
+    starts_with_header = False
     section_type = "unknown"
     importance = "medium"
-    lesson_id = f"lesson_{lesson_name}"
-    
+
     for line in lines:
         line = line.strip()
         if not line:
             # جداکننده بخش
-            if current_section and len('\n'.join(current_section).strip()) > 10:
-                chunks.append({
-                    "id": str(uuid4()),
-                    "lesson_id": lesson_id,
-                    "content": '\n'.join(current_section),
-                    "section_type": section_type,
-                    "importance": importance,
-                    "related_chunks": []
-                })
-                current_section = []
+            if current_length > MIN_SECTION_LENGTH:
+                yield '\n'.join(current_section), section_type, importance, starts_with_header
+                current_section, current_length = [], -1
                 section_type = "unknown"
                 importance = "medium"
             continue
-        
-        # تشخیص فصل
-        if line.startswith("فصل"):
-            if current_section:
-                chunks.append({
-                    "id": str(uuid4()),
-                    "lesson_id": lesson_id,
-                    "content": '\n'.join(current_section),
-                    "section_type": section_type,
-                    "importance": importance,
-                    "related_chunks": []
-                })
-                current_section = []
-            current_section.append(line)
-            section_type = "chapter_title"
-            importance = "high"
-        
-        # تشخیص عنوان درس
-        elif re.search(r"درس\s+\S+", line):
-            if current_section:
-                chunks.append({
-                    "id": str(uuid4()),
-                    "lesson_id": lesson_id,
-                    "content": '\n'.join(current_section),
-                    "section_type": section_type,
-                    "importance": importance,
-                    "related_chunks": []
-                })
-                current_section = []
-            current_section.append(line)
-            section_type = "lesson_title"
-            importance = "high"
-        
-        # تشخیص بخش‌های خاص
-        elif "درست" in line and "نادرست" in line:
-            section_type = "exercise_true_false"
-            importance = "medium"
-            current_section.append(line)
-        
-        elif "گوش کن و بگو" in line:
-            section_type = "listen_and_speak"
-            importance = "medium"
-            current_section.append(line)
-        
-        elif "پیدا کن و بگو" in line:
-            section_type = "find_and_say"
-            importance = "medium"
-            current_section.append(line)
-        
-        elif "فکر کن و بگو" in line:
-            section_type = "think_and_say"
-            importance = "medium"
-            current_section.append(line)
-        
-        elif "ایستگاه اندیشه" in line:
-            section_type = "thinking_station"
-            importance = "high"
-            current_section.append(line)
-        
-        elif "بخوان و بیندیش" in line:
-            section_type = "read_and_think"
-            importance = "high"
-            current_section.append(line)
-        
-        elif "واژه سازی" in line or "واژه‌سازی" in line:
-            section_type = "word_formation"
-            importance = "high"
-            current_section.append(line)
-        
-        elif "بیاموز و بگو" in line:
-            section_type = "learn_and_say"
-            importance = "high"
-            current_section.append(line)
-        
-        elif "بازی" in line:
-            section_type = "game_activity"
-            importance = "medium"
-            current_section.append(line)
-        
-        elif "بخوان و حفظ کن" in line:
-            section_type = "poem"
-            importance = "high"
-            current_section.append(line)
-        
-        
+
+        rule = classify_line(line)
+        if rule is not None:
+            _, rule_type, rule_importance, starts_section = rule
+            # فصل و عنوان درس همیشه بخش جدیدی شروع می‌کنند
+            if starts_section and current_section:
+                yield '\n'.join(current_section), section_type, importance, starts_with_header
+                current_section, current_length = [], -1
+            section_type = rule_type
+            importance = rule_importance
+
         # متن اصلی درس
-        elif len(line) > 50 and not section_type.startswith("exercise"):
-            if section_type in ["unknown", "lesson_title"]:
-                section_type = "main_story"
-                importance = "high"
-            current_section.append(line)
-        
-        else:
-            current_section.append(line)
-    
+        elif len(line) > MAIN_STORY_MIN_LINE_LENGTH and section_type in ("unknown", "lesson_title"):
+            section_type = "main_story"
+            importance = "high"
+
+        if not current_section:
+            starts_with_header = LESSON_HEADER_PATTERN.match(line) is not None
+        current_section.append(line)
+        current_length += len(line) + 1
+
     # افزودن آخرین بخش
     if current_section:
-        chunks.append({
-            "id": str(uuid4()),
-            "lesson_id": lesson_id,
-            "content": '\n'.join(current_section),
-            "section_type": section_type,
-            "importance": importance,
-            "related_chunks": []
-        })
-    
-    # افزودن روابط بین چانک‌ها
-    chunks = build_relations(chunks)
-    return chunks
+        yield '\n'.join(current_section), section_type, importance, starts_with_header
+
+
+def make_chunk(content: str, section_type: str, importance: str, lesson_id: str) -> dict:
+    return {
+        "id": str(uuid4()),
+        "lesson_id": lesson_id,
+        "content": content,
+        "section_type": section_type,
+        "importance": importance,
+        "related_chunks": []
+    }
+
+
+def chunk_by_semantic_sections(text: str, lesson_name: str = "unknown") -> List[dict]:
+    """تقسیم متن درس بر اساس ساختار معنایی و ارتباط بین بخش‌ها"""
+    return list(iter_semantic_chunks(text.strip().split('\n'), lesson_name=lesson_name))
+
+
+def iter_semantic_chunks(lines: Iterable[str], lesson_name: str = "unknown") -> Iterator[dict]:
+    """
+    نسخه‌ی جریانی chunk_by_semantic_sections
+
+    روابط (مثلاً تمرین ← متن اصلی) فقط داخل یک درس ساخته می‌شوند: از یک سرتیتر
+    فصل/درس (LESSON_HEADER_PATTERN) تا سرتیتر بعدی. چانک‌های هر درس با همان ترتیب
+    متن، در پایان آن درس yield می‌شوند، پس حافظه به اندازه‌ی یک درس است و نه کل فایل.
+    """
+    lesson_id = f"lesson_{lesson_name}"
+    lesson_chunks = []
+
+    for content, section_type, importance, starts_with_header in iter_sections(lines):
+        if starts_with_header and lesson_chunks:
+            yield from build_relations(lesson_chunks)
+            lesson_chunks = []
+        lesson_chunks.append(make_chunk(content, section_type, importance, lesson_id))
+
+    if lesson_chunks:
+        yield from build_relations(lesson_chunks)
+
+
+def iter_file_lines(path: str, use_mmap: bool = False) -> Iterator[str]:
+    """خواندن خط به خط فایل درس (معمولی یا با mmap) بدون بارگذاری کل فایل"""
+    if not use_mmap:
+        with open(path, "r", encoding="utf-8") as f:
+            yield from f
+        return
+
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for raw_line in iter(mm.readline, b""):
+                yield raw_line.decode("utf-8")
+
+
+def iter_lesson_chunks(path: str, use_mmap: bool = False) -> Iterator[dict]:
+    """چانک‌های یک فایل درس به صورت جریانی (نام درس از نام فایل گرفته می‌شود)"""
+    lesson_name = os.path.splitext(os.path.basename(path))[0]
+    yield from iter_semantic_chunks(iter_file_lines(path, use_mmap), lesson_name=lesson_name)
 
 
 # ==================== تابع ساخت روابط ====================
 
 def build_relations(chunks: List[dict]) -> List[dict]:
     """افزودن روابط بین چانک‌ها بر اساس قواعد آموزشی"""
+    # یک‌بار گروه‌بندی به جای جستجوی کامل لیست برای هر چانک
+    ids_by_target = {}
+    for chunk in chunks:
+        if chunk["section_type"] in RELATION_RULES.values():
+            key = (chunk["lesson_id"], chunk["section_type"])
+            ids_by_target.setdefault(key, []).append(chunk["id"])
+
     for chunk in chunks:
-        if chunk["section_type"] == "exercise_true_false":
-            chunk["related_chunks"] = find_related(chunks, chunk["lesson_id"], "main_story")
-        
-        elif chunk["section_type"] in ["listen_and_speak", "find_and_say", "think_and_say"]:
-            chunk["related_chunks"] = find_related(chunks, chunk["lesson_id"], "main_story")
-        
-        elif chunk["section_type"] == "thinking_station":
-            chunk["related_chunks"] = find_related(chunks, chunk["lesson_id"], "read_and_think")
-    
+        target_type = RELATION_RULES.get(chunk["section_type"])
+        if target_type:
+            chunk["related_chunks"] = list(ids_by_target.get((chunk["lesson_id"], target_type), []))
+
     return chunks
 
 
-def find_related(chunks: List[dict], lesson_id: str, target_type: str) -> List[str]:
-    """پیدا کردن شناسه‌ی چانک‌های مرتبط در همان درس"""
-    return [c["id"] for c in chunks if c["lesson_id"] == lesson_id and c["section_type"] == target_type]
+# ==================== تنظیمات ایندکس برداری ====================
+
+# پیش‌تنظیم‌ها؛ هر کلید را می‌توان با متغیر محیطی هم‌نام بازنویسی کرد (جدول INDEX_ENV_VARS)
+INDEX_PRESETS = {
+    # HNSW با بردارهای کامل float32 (رفتار پیش‌فرض Weaviate)
+    "default": {"index_type": "hnsw"},
+    # ایندکس flat برای tenant های خیلی کوچک: جستجوی brute force بدون گراف HNSW
+    "tiny": {"index_type": "flat"},
+    "flat_bq": {"index_type": "flat", "quantizer": "bq", "rescore_limit": 200},
+    "hnsw_pq": {"index_type": "hnsw", "quantizer": "pq", "pq_segments": 128},
+    "hnsw_bq": {"index_type": "hnsw", "quantizer": "bq", "rescore_limit": 200},
+    "hnsw_sq": {"index_type": "hnsw", "quantizer": "sq", "rescore_limit": 200},
+}
+
+INDEX_ENV_VARS = {
+    "index_type": ("WEAVIATE_INDEX_TYPE", str),
+    "ef": ("WEAVIATE_HNSW_EF", int),
+    "ef_construction": ("WEAVIATE_HNSW_EF_CONSTRUCTION", int),
+    "max_connections": ("WEAVIATE_HNSW_MAX_CONNECTIONS", int),
+    "quantizer": ("WEAVIATE_QUANTIZER", str),
+    "rescore_limit": ("WEAVIATE_RESCORE_LIMIT", int),
+    "pq_segments": ("WEAVIATE_PQ_SEGMENTS", int),
+    "training_limit": ("WEAVIATE_QUANTIZER_TRAINING_LIMIT", int),
+}
+
+
+def load_index_settings(preset: Optional[str] = None) -> dict:
+    """خواندن تنظیمات ایندکس از پیش‌تنظیم (WEAVIATE_INDEX_PRESET) و متغیرهای محیطی"""
+    preset = preset or os.getenv("WEAVIATE_INDEX_PRESET", "default")
+    if preset not in INDEX_PRESETS:
+        raise ValueError(f"پیش‌تنظیم ناشناخته: {preset} (موجود: {', '.join(INDEX_PRESETS)})")
+
+    settings = dict(INDEX_PRESETS[preset], preset=preset)
+    for key, (env_name, cast) in INDEX_ENV_VARS.items():
+        value = os.getenv(env_name)
+        if value:
+            settings[key] = cast(value)
+    return settings
+
+
+def build_vector_index_config(settings: dict):
+    """تبدیل تنظیمات به vector_index_config برای Weaviate"""
+    index_type = settings.get("index_type", "hnsw")
+    quantizer_name = settings.get("quantizer")
+    rescore_limit = settings.get("rescore_limit")
+    training_limit = settings.get("training_limit")
+
+    quantizer = None
+    if quantizer_name == "pq":
+        quantizer = Configure.VectorIndex.Quantizer.pq(
+            segments=settings.get("pq_segments"), training_limit=training_limit
+        )
+    elif quantizer_name == "bq":
+        quantizer = Configure.VectorIndex.Quantizer.bq(rescore_limit=rescore_limit)
+    elif quantizer_name == "sq":
+        quantizer = Configure.VectorIndex.Quantizer.sq(
+            rescore_limit=rescore_limit, training_limit=training_limit
+        )
+    elif quantizer_name:
+        raise ValueError(f"quantizer ناشناخته: {quantizer_name} (pq / bq / sq)")
+
+    if index_type == "flat":
+        if quantizer_name not in (None, "bq"):
+            raise ValueError("ایندکس flat فقط از فشرده‌سازی bq پشتیبانی می‌کند")
+        return Configure.VectorIndex.flat(quantizer=quantizer)
+
+    if index_type == "hnsw":
+        return Configure.VectorIndex.hnsw(
+            ef=settings.get("ef"),
+            ef_construction=settings.get("ef_construction"),
+            max_connections=settings.get("max_connections"),
+            quantizer=quantizer,
+        )
+
+    raise ValueError(f"نوع ایندکس ناشناخته: {index_type} (hnsw / flat)")
+
+
+def describe_index_settings(settings: dict) -> str:
+    return ", ".join(f"{key}={value}" for key, value in settings.items() if value is not None)
 
 
 # ==================== Setup Weaviate ====================
 
-def setup_weaviate_collection():
-    """ساخت Collection با تنظیمات embedding"""
+def setup_weaviate_collection(index_settings: Optional[dict] = None):
+    """ساخت Collection با تنظیمات embedding و ایندکس برداری"""
+    index_settings = index_settings or load_index_settings()
+    vector_index_config = build_vector_index_config(index_settings)
+
     print("🔄 در حال اتصال به Weaviate...")
     client = weaviate.connect_to_local(host="localhost", port=8080)
     print("✅ اتصال برقرار شد")
 
     # حذف کالکشن قدیمی
     try:
-        client.collections.delete("Question")
+        client.collections.delete(COLLECTION_NAME)
         print("⚠️ Collection قبلی حذف شد")
     except:
         print("ℹ️ Collection قبلی وجود نداشت")
 
     # ساخت کالکشن جدید
     print("🔧 در حال ساخت Collection با مدل bge-m3...")
+    print(f"📐 ایندکس برداری: {describe_index_settings(index_settings)}")
 
     client.collections.create(
-        name="Question",
+        name=COLLECTION_NAME,
         vectorizer_config=Configure.Vectorizer.text2vec_ollama(
-            api_endpoint="http://host.docker.internal:11434",
-            model="bge-m3:latest"
+            api_endpoint=OLLAMA_ENDPOINT,
+            model=EMBEDDING_MODEL
         ),
+        vector_index_config=vector_index_config,
         properties=[
             Property(name="content", data_type=DataType.TEXT, description="محتوای اصلی"),
             Property(name="section_type", data_type=DataType.TEXT, description="نوع بخش"),
@@ -223,7 +331,7 @@ def import_lessons():
         return
 
     client = weaviate.connect_to_local(host="localhost", port=8080)
-    questions = client.collections.get("Question")
+    questions = client.collections.get(COLLECTION_NAME)
 
     lesson_files = [f for f in os.listdir(lessons_dir) if f.endswith(".txt")]
 
@@ -232,14 +340,12 @@ def import_lessons():
         lesson_name = os.path.splitext(lesson_file)[0]
 
         print(f"\n📘 در حال پردازش {lesson_name} ...")
-        with open(lesson_path, "r", encoding="utf-8") as f:
-            content = f.read()
-
-        chunks_data = chunk_by_semantic_sections(content, lesson_name=lesson_name)
-        print(f"✂️ {len(chunks_data)} بخش شناسایی شد")
+        chunk_count = 0
 
+        # چانک‌ها به صورت جریانی ساخته و مستقیم وارد batch می‌شوند
         with questions.batch.dynamic() as batch:
-            for chunk in chunks_data:
+            for chunk in iter_lesson_chunks(lesson_path):
+                chunk_count += 1
                 batch.add_object({
                     "content": chunk["content"],
                     "section_type": chunk["section_type"],
@@ -250,20 +356,227 @@ def import_lessons():
                     "related_chunks": chunk["related_chunks"],
                 })
 
-        print(f"✅ {lesson_name}: {len(chunks_data)} بخش وارد شد")
+        print(f"✂️ {chunk_count} بخش شناسایی شد")
+        print(f"✅ {lesson_name}: {chunk_count} بخش وارد شد")
 
     client.close()
     print("\n🎉 همه‌ی دروس با موفقیت وارد Weaviate شدند ✅")
 
 
+# ==================== Vector Snapshot ====================
+
+SNAPSHOT_FORMAT_VERSION = 1
+
+
+def snapshot_paths(prefix: str) -> Tuple[str, str]:
+    """فایل بردارها (NumPy) و فایل متادیتا (JSON) یک snapshot"""
+    return f"{prefix}.vectors.npy", f"{prefix}.meta.json"
+
+
+def get_vector_source(collection) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (نام بردار، نام مدل embedding) که Collection واقعاً با آن ساخته شده
+
+    برای Collection با بردار واحد نام بردار "default" است. برای named vector همان
+    یک نام برگردانده می‌شود؛ اگر چند named vector وجود داشته باشد معلوم نیست کدام
+    را باید خروجی گرفت و (None, None) برمی‌گردد.
+    """
+    config = collection.config.get()
+    vector_name, vectorizer = "default", config.vectorizer_config
+    if vectorizer is None and getattr(config, "vector_config", None):
+        if len(config.vector_config) != 1:
+            print(f"❌ Collection چند named vector دارد: {', '.join(config.vector_config)}")
+            return None, None
+        vector_name, named = next(iter(config.vector_config.items()))
+        vectorizer = named.vectorizer
+    if vectorizer is None:
+        return None, None
+    return vector_name, (vectorizer.model or {}).get("model")
+
+
+def export_snapshot(prefix: str) -> bool:
+    """ذخیره‌ی همه‌ی چانک‌ها به همراه بردارهایشان تا replica جدید نیازی به embedding نداشته باشد"""
+    import numpy as np
+
+    vectors_path, meta_path = snapshot_paths(prefix)
+    os.makedirs(os.path.dirname(prefix) or ".", exist_ok=True)
+
+    client = weaviate.connect_to_local(host="localhost", port=8080)
+    questions = client.collections.get(COLLECTION_NAME)
+
+    print(f"📤 در حال خروجی گرفتن از {COLLECTION_NAME} ...")
+    objects = []
+    vectors = []
+    try:
+        vector_name, model = get_vector_source(questions)
+        if not model:
+            print(f"❌ مدل embedding مربوط به {COLLECTION_NAME} از تنظیمات Collection خوانده نشد")
+            return False
+        print(f"   └─ بردار '{vector_name}' با مدل {model}")
+        for obj in questions.iterator(include_vector=True):
+            vector = obj.vector.get(vector_name) if isinstance(obj.vector, dict) else obj.vector
+            if not vector:
+                print(f"⚠️ شیء {obj.uuid} بردار ندارد و رد شد")
+                continue
+            objects.append({"uuid": str(obj.uuid), "properties": obj.properties})
+            vectors.append(vector)
+    finally:
+        client.close()
+
+    if not objects:
+        print("❌ هیچ شیئی برای خروجی پیدا نشد")
+        return False
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    np.save(vectors_path, matrix)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "collection": COLLECTION_NAME,
+            "model": model,
+            "dim": int(matrix.shape[1]),
+            "count": len(objects),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "objects": objects,
+        }, f, ensure_ascii=False)
+
+    print(f"✅ {len(objects)} شیء با بردار {matrix.shape[1]} بعدی ذخیره شد")
+    print(f"   ├─ بردارها: {vectors_path}")
+    print(f"   └─ متادیتا: {meta_path}")
+    return True
+
+
+def load_snapshot(prefix: str, force: bool = False):
+    """خواندن و بررسی سازگاری snapshot؛ در صورت ناسازگاری (None, None)"""
+    import numpy as np
+
+    vectors_path, meta_path = snapshot_paths(prefix)
+    if not (os.path.exists(vectors_path) and os.path.exists(meta_path)):
+        print(f"❌ فایل‌های snapshot پیدا نشد: {vectors_path} / {meta_path}")
+        return None, None
+
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        vectors = np.load(vectors_path, mmap_mode="r")
+    except (OSError, ValueError) as e:
+        # ValueError شامل JSONDecodeError، UnicodeDecodeError و فایل npy خراب است
+        print(f"❌ فایل‌های snapshot خوانده نشد: {str(e)}")
+        return None, None
+
+    if not isinstance(meta, dict) or meta.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        version = meta.get("format_version") if isinstance(meta, dict) else None
+        print(f"❌ نسخه‌ی snapshot پشتیبانی نمی‌شود: {version}")
+        return None, None
+
+    missing = [key for key in ("count", "dim", "objects") if key not in meta]
+    if missing:
+        print(f"❌ متادیتای snapshot ناقص است (کلیدهای {', '.join(missing)} وجود ندارد)")
+        return None, None
+
+    if vectors.shape != (meta["count"], meta["dim"]):
+        print(f"❌ ابعاد بردارها ({vectors.shape}) با متادیتا ({meta['count']}, {meta['dim']}) نمی‌خواند")
+        return None, None
+
+    if not isinstance(meta["objects"], list) or len(meta["objects"]) != meta["count"]:
+        print(f"❌ فهرست objects در متادیتا با count ({meta['count']}) نمی‌خواند")
+        return None, None
+
+    if meta.get("model") != EMBEDDING_MODEL:
+        print(f"⚠️ مدل snapshot ({meta.get('model')}) با مدل فعلی ({EMBEDDING_MODEL}) فرق دارد")
+        if not force:
+            print("❌ بردارهای مدل دیگر با کوئری‌های near_text سازگار نیستند (برای نادیده گرفتن: --force)")
+            return None, None
+
+    return meta, vectors
+
+
+def import_snapshot(prefix: str, force: bool = False, index_settings: Optional[dict] = None) -> bool:
+    """
+    ساخت دوباره‌ی Collection و وارد کردن اشیا با بردارهای آماده (بدون فراخوانی Ollama)
+
+    اگر snapshot ناسازگار باشد یا حتی یک شیء وارد نشود False برمی‌گرداند
+    """
+    meta, vectors = load_snapshot(prefix, force=force)
+    if meta is None:
+        return False
+
+    setup_weaviate_collection(index_settings)
+
+    client = weaviate.connect_to_local(host="localhost", port=8080)
+    questions = client.collections.get(COLLECTION_NAME)
+
+    print(f"📥 در حال وارد کردن {meta['count']} شیء از snapshot ...")
+    started = time.perf_counter()
+    try:
+        with questions.batch.fixed_size(batch_size=1000) as batch:
+            for obj, vector in zip(meta["objects"], vectors):
+                batch.add_object(
+                    properties=obj["properties"],
+                    uuid=obj["uuid"],
+                    vector=vector.tolist(),
+                )
+        failed = len(questions.batch.failed_objects)
+    finally:
+        client.close()
+
+    elapsed = time.perf_counter() - started
+    if failed:
+        print(f"❌ {failed} شیء از {meta['count']} وارد نشد؛ replica کامل نیست")
+        return False
+    print(f"✅ {meta['count']} شیء در {elapsed:.1f} ثانیه وارد شد (بدون embedding دوباره)")
+    return True
+
+
 # ==================== Main ====================
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ساخت Collection و وارد کردن دروس در Weaviate")
+    parser.add_argument("--index-preset", choices=list(INDEX_PRESETS), help="پیش‌تنظیم ایندکس برداری")
+    parser.add_argument("--benchmark-index", action="store_true",
+                        help="مقایسه‌ی پیش‌تنظیم‌های ایندکس روی داده‌ی مصنوعی (بدون تغییر Question)")
+    parser.add_argument("--bench-size", type=int, default=20000, help="تعداد بردارهای مصنوعی")
+    parser.add_argument("--bench-queries", type=int, default=200)
+    parser.add_argument("--bench-k", type=int, default=10)
+    parser.add_argument("--bench-presets", nargs="+", choices=list(INDEX_PRESETS), default=list(INDEX_PRESETS))
+    parser.add_argument("--bench-restart-cmd",
+                        help="دستور راه‌اندازی دوباره‌ی Weaviate قبل از هر پیش‌تنظیم تا RSS جداگانه اندازه‌گیری شود")
+    parser.add_argument("--export-snapshot", metavar="PREFIX",
+                        help="ذخیره‌ی چانک‌ها و بردارها در PREFIX.vectors.npy و PREFIX.meta.json")
+    parser.add_argument("--import-snapshot", metavar="PREFIX",
+                        help="ساخت Collection از snapshot به جای چانک کردن و embedding دوباره")
+    parser.add_argument("--force", action="store_true", help="وارد کردن snapshot حتی با مدل embedding متفاوت")
+    args = parser.parse_args()
+
+    if args.export_snapshot:
+        ok = export_snapshot(args.export_snapshot)
+        raise SystemExit(0 if ok else 1)
+
+    if args.import_snapshot:
+        print("=" * 60)
+        print("🚀 Setup Weaviate - از روی snapshot")
+        print("=" * 60)
+        ok = import_snapshot(args.import_snapshot, force=args.force,
+                             index_settings=load_index_settings(args.index_preset))
+        raise SystemExit(0 if ok else 1)
+
+    if args.benchmark_index:
+        from benchmarks.vector_index import run_index_benchmark
+
+        run_index_benchmark(
+            presets=args.bench_presets,
+            corpus_size=args.bench_size,
+            query_count=args.bench_queries,
+            k=args.bench_k,
+            restart_command=args.bench_restart_cmd,
+        )
+        raise SystemExit(0)
+
     print("=" * 60)
     print("🚀 Setup Weaviate - مرحله اولیه")
     print("=" * 60)
 
-    setup_weaviate_collection()
+    setup_weaviate_collection(load_index_settings(args.index_preset))
     import_lessons()
 
     print("\n🎯 عملیات Setup کامل شد ✅")